@@ -1,8 +1,10 @@
 import os
 import glob
 import logging
+import collections
 
 logger = logging.getLogger(__name__)
+_path_prefixes = {}
 
 
 class Path(object):
@@ -35,3 +37,135 @@ class Path(object):
                 return files
 
         return get_files_rec(self._path)
+
+
+def intern_prefix(prefix):
+    """
+    Return the shared instance of a directory prefix so that every
+    path living under the same directory references one string.
+    Works for both str and unicode (paths loaded from json are unicode).
+    """
+    return _path_prefixes.setdefault(prefix, prefix)
+
+
+class CompactPathList(object):
+    """
+    List-like view over file paths.
+
+    Paths are stored as an interned directory prefix plus a leaf name.
+    Contents of file containers across a show share long directory
+    prefixes (/project/sq100/s10/char/...) so storing them once
+    considerably reduces the memory footprint of loaded assets.
+    Reading from it yields the original, full path strings.
+    """
+    __slots__ = ('_prefixes', '_leaves')
+
+    def __init__(self, paths=None):
+        self._prefixes = []
+        self._leaves = []
+        if paths:
+            self.extend(paths)
+
+    @staticmethod
+    def _split(path, intern=True):
+        # Lookups must not grow the shared prefixes with paths that are
+        # never stored.
+        prefix, sep, leaf = path.rpartition('/')
+        if intern:
+            return intern_prefix(prefix + sep), leaf
+        return _path_prefixes.get(prefix + sep, prefix + sep), leaf
+
+    def append(self, path):
+        prefix, leaf = self._split(path)
+        self._prefixes.append(prefix)
+        self._leaves.append(leaf)
+
+    def extend(self, paths):
+        for path in paths:
+            self.append(path)
+
+    def insert(self, index, path):
+        prefix, leaf = self._split(path)
+        self._prefixes.insert(index, prefix)
+        self._leaves.insert(index, leaf)
+
+    def remove(self, path):
+        del self[self.index(path)]
+
+    def index(self, path):
+        prefix, leaf = self._split(path, intern=False)
+        for i, (p, l) in enumerate(zip(self._prefixes, self._leaves)):
+            if l == leaf and p == prefix:
+                return i
+        raise ValueError("{} is not in list".format(path))
+
+    def count(self, path):
+        prefix, leaf = self._split(path, intern=False)
+        return sum(1 for p, l in zip(self._prefixes, self._leaves)
+                   if l == leaf and p == prefix)
+
+    def parts(self):
+        """
+        Generate (prefix, leaf) pairs without joining them into paths.
+        """
+        for prefix, leaf in zip(self._prefixes, self._leaves):
+            yield prefix, leaf
+
+    def __len__(self):
+        return len(self._leaves)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return self._prefixes[index] + self._leaves[index]
+
+    def __setitem__(self, index, path):
+        if isinstance(index, slice):
+            paths = list(self)
+            paths[index] = path
+            self._prefixes = []
+            self._leaves = []
+            self.extend(paths)
+            return
+        self._prefixes[index], self._leaves[index] = self._split(path)
+
+    def __delitem__(self, index):
+        del self._prefixes[index]
+        del self._leaves[index]
+
+    def __iter__(self):
+        for prefix, leaf in zip(self._prefixes, self._leaves):
+            yield prefix + leaf
+
+    def __contains__(self, path):
+        try:
+            self.index(path)
+        except (ValueError, AttributeError):
+            return False
+        return True
+
+    def __eq__(self, other):
+        if isinstance(other, (CompactPathList, list, tuple)):
+            return len(self) == len(other) and \
+                   all(x == y for x, y in zip(self, other))
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None
+
+    def __getstate__(self):
+        return {'paths': list(self)}
+
+    def __setstate__(self, state):
+        self._prefixes = []
+        self._leaves = []
+        self.extend(state['paths'])
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+collections.Sequence.register(CompactPathList)
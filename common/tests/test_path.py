@@ -1,5 +1,7 @@
+import pickle
 import unittest
-from common.path import Path
+import common.path as cpath
+from common.path import Path, CompactPathList
 
 
 class PathTestCases(unittest.TestCase):
@@ -16,5 +18,53 @@ class PathTestCases(unittest.TestCase):
         self.assertEqual(len(self._path.get_files(ext='json', recursive=True)), 3)
 
 
+class CompactPathListTestCase(unittest.TestCase):
+    def setUp(self):
+        self.paths = ['/project/sq100/s10/char/david/anim_export/david1_body.mc',
+                      '/project/sq100/s10/char/david/anim_export/david1_face.mc',
+                      'relative_file.mc']
+        self.path_list = CompactPathList(self.paths)
+
+    def test_list_view(self):
+        self.assertEqual(self.path_list, self.paths)
+        self.assertEqual(len(self.path_list), 3)
+        self.assertEqual(self.path_list[1], self.paths[1])
+        self.assertEqual(self.path_list[-1], 'relative_file.mc')
+        self.assertEqual(self.path_list[:2], self.paths[:2])
+        self.assertTrue(self.paths[0] in self.path_list)
+        self.assertFalse('/project/other.mc' in self.path_list)
+
+    def test_shared_prefixes(self):
+        other = CompactPathList(self.paths[:1])
+        self.assertTrue(self.path_list._prefixes[0] is
+                        self.path_list._prefixes[1])
+        self.assertTrue(self.path_list._prefixes[0] is other._prefixes[0])
+
+    def test_pickle(self):
+        for protocol in (0, 2):
+            path_list = pickle.loads(pickle.dumps(self.path_list, protocol))
+            self.assertEqual(path_list, self.paths)
+            self.assertTrue(path_list._prefixes[0] is
+                            self.path_list._prefixes[0])
+        empty = pickle.loads(pickle.dumps(CompactPathList(), 0))
+        self.assertEqual(empty, [])
+
+    def test_lookup_does_not_intern(self):
+        num_prefixes = len(cpath._path_prefixes)
+        for i in range(10):
+            self.assertFalse('/project/missing{}/file.mc'.format(i)
+                             in self.path_list)
+            self.assertEqual(self.path_list.count('/missing{}/a.mc'.format(i)), 0)
+        self.assertEqual(len(cpath._path_prefixes), num_prefixes)
+
+    def test_modify(self):
+        self.path_list.append('/project/new.mc')
+        self.path_list.remove(self.paths[0])
+        self.path_list[0] = '/project/replaced.mc'
+        self.assertEqual(self.path_list, ['/project/replaced.mc',
+                                          'relative_file.mc',
+                                          '/project/new.mc'])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -4,3 +4,21 @@ import collections
 def create_constant(**named_attributes):
     constant_container = collections.namedtuple('ConstantContainer', named_attributes.keys())
     return constant_container(*named_attributes.values())
+
+
+def get_slots_state(obj):
+    """
+    Pickle state of an object using __slots__. Python 2 cannot pickle
+    those with protocols 0 and 1 unless the class defines __getstate__.
+    """
+    state = {}
+    for cls in type(obj).__mro__:
+        for attr in getattr(cls, '__slots__', ()):
+            if attr != '__weakref__' and hasattr(obj, attr):
+                state[attr] = getattr(obj, attr)
+    return state
+
+
+def set_slots_state(obj, state):
+    for attr, value in state.items():
+        setattr(obj, attr, value)
@@ -27,8 +27,11 @@
 
 """
 import utils
+import weakref
 import constants
 import logging
+import common.utils as cutils
+from common.path import CompactPathList
 from pipeline.database.store import Store
 from .exceptions import DataMismatchException, \
                         AssetVersionInitializationException
@@ -37,37 +40,59 @@ from .slot import Slot
 
 
 logger = logging.getLogger(__name__)
+# Weak references to the live Asset objects of each slot, refreshed
+# from the Store change feed. Slots are dropped once their assets die.
+_live_assets = {}
 
 
 class AssetBase(object):
+    __slots__ = ('_name', '_name_generator')
+
     def __init__(self, name):
         self._name = name
         self._name_generator = name_generator_factory(self)
 
     def name(self):
         if not self._name:
-            self._name = self._name_generator.generate_name()
+            self._name = self._name_generator.generate_name(self)
         return self._name
 
     def set_name(self, name):
         self._name = name
 
+    def __getstate__(self):
+        # Name generators are shared, they are not part of the state
+        state = cutils.get_slots_state(self)
+        state.pop('_name_generator', None)
+        return state
+
+    def __setstate__(self, state):
+        cutils.set_slots_state(self, state)
+        self._name_generator = name_generator_factory(self)
+
 
 class Asset(AssetBase):
-    def __init__(self, slot, name=None):
+    __slots__ = ('_slot', '_versions', '_latest_version', '_metadata',
+                 '__weakref__')
+
+    def __init__(self, slot, name=None, versions_data=None):
         """
         @:param slot: instance of slot.Slot object representing the place
                       or the location of the asset. Location does not
                       refer to the location in the file system. It is a
                       uniquely identifiable path in the data structure
                       established for production.
+        @:param versions_data: versions of the slot already read from the
+                               Store, saves querying them again. The slot
+                               type is then trusted to match the Store.
         """
         super(Asset, self).__init__(name)
         self._slot = slot
         self._versions = []
         self._latest_version = 0
         self._metadata = {}
-        self._load_versions()
+        self._load_versions(versions_data)
+        _track_asset(self)
 
     def slot(self):
         return self._slot.id()
@@ -98,11 +123,51 @@ class Asset(AssetBase):
         )
         self._latest_version = self._latest_version + 1
 
-    def _load_versions(self):
-        if Store.get_entries(self.slot()) is None:
+    def __setstate__(self, state):
+        super(Asset, self).__setstate__(state)
+        _track_asset(self)
+
+    def reload(self):
+        """
+        Load all the versions of this asset from the Store again.
+        """
+        self._versions = []
+        self._latest_version = 0
+        self._load_versions()
+
+    def refresh_version(self, version):
+        """
+        Pick up a version that was committed to, changed in or removed
+        from the Store after this asset was loaded.
+        """
+        asset_version = self.version(version)
+        if Store.get_version_data(self.slot(), version) is None:
+            if asset_version is not None:
+                self._versions.remove(asset_version)
+                self._latest_version = 0 if len(self._versions) == 0 \
+                    else self._versions[-1].version()
+            return
+        if asset_version is not None:
+            asset_version.reload()
+            return
+        self._versions.append(AssetVersion(asset=self, version=version))
+        self._versions.sort(key=lambda x: x.version())
+        self._latest_version = self._versions[-1].version()
+        logger.debug("Refreshed {} (latest:v{})"
+                     .format(self.name(), self.latest_version()))
+
+    def _load_versions(self, versions_data=None):
+        if versions_data is None:
+            # Single round trip when the Store is served by a Store server.
+            asset_type, versions_data = Store.batch([
+                ('get_type_data', (self.slot(),)),
+                ('get_versions_data', (self.slot(),))
+            ])
+        else:
+            asset_type = self.slot_type()
+        if versions_data is None:
             logger.warning("No versions found for {}".format(self.name()))
             return
-        asset_type = Store.get_type_data(self.slot())
 
         if asset_type != self.slot_type():
             logger.error("Mismatch in asset type between Asset object"
@@ -114,11 +179,12 @@ class Asset(AssetBase):
             raise DataMismatchException
 
         logger.info(self)
-        for version in Store.get_versions_data(self.slot()):
+        for version in sorted(versions_data):
             self._versions.append(
                 AssetVersion(
                     asset=self,
                     version=version,
+                    version_data=versions_data[version]
                 )
             )
         self._latest_version = 0 if len(self._versions) == 0 \
@@ -145,12 +211,20 @@ class Asset(AssetBase):
     def __repr__(self):
         return '{class_}({_slot})'.format(
             class_=type(self).__name__,
-            **vars(self)
+            _slot=self._slot
         )
 
 
 class AssetVersion(AssetBase):
-    def __init__(self, asset, version, contents=None, name=None):
+    __slots__ = ('_asset', '_version', '_dependencies',
+                 '_dependencies_loaded', '_container')
+
+    def __init__(self, asset, version, contents=None, name=None,
+                 version_data=None):
+        """
+        @:param version_data: record of an existing version already read
+                              from the Store, saves querying it again
+        """
         super(AssetVersion, self).__init__(name)
         self._asset = asset
         self._version = version
@@ -158,7 +232,7 @@ class AssetVersion(AssetBase):
         self._dependencies_loaded = False
         self._container = None
 
-        self._initialize_container(contents)
+        self._initialize_container(contents, version_data)
 
     def slot(self):
         return self._asset.slot()
@@ -188,15 +262,27 @@ class AssetVersion(AssetBase):
             logger.debug("Loaded {} dependencies".format(len(self.dependencies())))
         return self._dependencies
 
+    def reload(self):
+        """
+        Re-read the contents and dependencies of this version from the Store.
+        """
+        self._dependencies = []
+        self._dependencies_loaded = False
+        self._container.set_contents([])
+        self._container.load_contents(self.slot(), self.version())
+
     def add_dependency(self, asset_version):
         for dep in self._dependencies:
             if dep == asset_version:
                 return
         self._dependencies.append(asset_version)
 
-    def _initialize_container(self, contents):
+    def _initialize_container(self, contents, version_data=None):
         self._container = container_factory(self.slot_type())
-        if self._is_new_version():
+        if version_data is not None:
+            self._container.load_contents(self.slot(), self.version(),
+                                          version_data.get('contents', []))
+        elif self._is_new_version():
             if not contents:
                 logger.error("Cannot create an AssetVersion: no contents passed.")
                 raise AssetVersionInitializationException
@@ -207,10 +293,18 @@ class AssetVersion(AssetBase):
             self._container.load_contents(self.slot(), self.version())
 
     def _load_dependencies(self):
-        for dep in Store.get_dependency_data(self.slot(), self.version()):
-            stype_ = Store.get_type_data(dep[0])
+        dependencies = Store.get_dependency_data(self.slot(), self.version())
+        # Types and versions of all the dependencies in one round trip
+        slots = sorted(set(dep[0] for dep in dependencies))
+        results = Store.batch([(method, (slot_,)) for slot_ in slots
+                               for method in ('get_type_data',
+                                              'get_versions_data')])
+        slots_data = dict((slot_, results[2 * i:2 * i + 2])
+                          for i, slot_ in enumerate(slots))
+        for dep in dependencies:
+            stype_, versions_data = slots_data[dep[0]]
             slot_ = Slot(type=stype_, path=dep[0])
-            asset_ = Asset(slot=slot_)
+            asset_ = Asset(slot=slot_, versions_data=versions_data)
             for asset_version in asset_.versions():
                 if asset_version.version() == dep[1]:
                     self._dependencies.append(asset_version)
@@ -234,18 +328,30 @@ class AssetVersion(AssetBase):
     def __repr__(self):
         return '{class_}({_version}, {_slot}, {_asset})'.format(
             class_=type(self).__name__,
-            **vars(self)
+            _version=self._version,
+            _slot=self.slot(),
+            _asset=repr(self._asset)
         )
 
 
 class FileContainer(Container):
+    __slots__ = ()
+
     def __init__(self):
         super(FileContainer, self).__init__()
         self._type = constants.CONTENT_TYPE.File
+        self._contents = CompactPathList()
 
-    def load_contents(self, slot, version):
+    def set_contents(self, contents):
+        super(FileContainer, self).set_contents(contents)
+        if not isinstance(self._contents, CompactPathList):
+            self._contents = CompactPathList(self._contents)
+
+    def load_contents(self, slot, version, contents=None):
+        if contents is None:
+            contents = Store.get_content_data(slot, version)
         with CheckZeroContents(self, slot, version):
-            self.set_contents(Store.get_content_data(slot, version))
+            self.set_contents(contents)
 
     def _is_valid(self, content):
         return isinstance(content, str) or isinstance(content, unicode)
@@ -255,13 +361,17 @@ class FileContainer(Container):
 
 
 class AssetContainer(Container):
+    __slots__ = ()
+
     def __init__(self):
         super(AssetContainer, self).__init__()
         self._type = constants.CONTENT_TYPE.Asset
 
-    def load_contents(self, slot, version):
+    def load_contents(self, slot, version, contents=None):
+        if contents is None:
+            contents = Store.get_content_data(slot, version)
         with CheckZeroContents(self, slot, version):
-            for item in Store.get_content_data(slot, version):
+            for item in contents:
                 self.add_content(item)
 
     def _is_valid(self, content):
@@ -276,6 +386,8 @@ class AssetContainer(Container):
 
 
 class CheckZeroContents(object):
+    __slots__ = ('_container', '_slot', '_version')
+
     def __init__(self, container, slot, version):
         self._container = container
         self._slot = slot
@@ -307,8 +419,40 @@ def name_generator_factory(item):
     Factory method to create name generators.
     For now there is only one way to generate names. Potentially there
     could be many different ways to do that based on the given "item".
+    Generators are stateless and shared between all the items they
+    are created for, so the name rules are only loaded once.
     :param item: Specifies criteria to create a generator
     :return: Name generator object
     """
     if isinstance(item, Asset) or isinstance(item, AssetVersion):
-        return utils.AssetNameGenerator(item)
+        return utils.shared_name_generator(utils.AssetNameGenerator)
+
+
+def _track_asset(asset_):
+    ref = weakref.KeyedRef(asset_, _untrack_asset, asset_.slot())
+    _live_assets.setdefault(ref.key, []).append(ref)
+
+
+def _untrack_asset(ref):
+    refs = _live_assets.get(ref.key, [])
+    if ref in refs:
+        refs.remove(ref)
+    if not refs:
+        _live_assets.pop(ref.key, None)
+
+
+def _on_store_change(slot, version):
+    if slot is None:
+        for refs in list(_live_assets.values()):
+            for ref in list(refs):
+                asset_ = ref()
+                if asset_ is not None:
+                    asset_.reload()
+        return
+    for ref in list(_live_assets.get(slot, [])):
+        asset_ = ref()
+        if asset_ is not None:
+            asset_.refresh_version(version)
+
+
+Store.subscribe(_on_store_change)
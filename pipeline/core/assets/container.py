@@ -1,7 +1,10 @@
 import abc
+import common.utils as cutils
 
 
 class Container(object):
+    __slots__ = ('_type', '_contents')
+
     def __init__(self):
         self._type = None
         self._contents = []
@@ -26,6 +29,12 @@ class Container(object):
     def type(self):
         return self._type
 
+    def __getstate__(self):
+        return cutils.get_slots_state(self)
+
+    def __setstate__(self, state):
+        cutils.set_slots_state(self, state)
+
     def set_type(self, type_):
         self._type = type_
 
@@ -41,20 +50,16 @@ class Container(object):
         raise NotImplementedError
 
     @abc.abstractmethod
-    def load_contents(self, slot, version):
+    def load_contents(self, slot, version, contents=None):
         raise NotImplementedError
 
     def __str__(self):
         return '{class_}:{_type}'.format(
             class_=type(self).__name__,
-            **vars(self)
+            _type=self._type
         )
 
     def __repr__(self):
         return '{class_}()'.format(
-            class_=type(self).__name__,
-            **vars(self)
+            class_=type(self).__name__
         )
-
-
-
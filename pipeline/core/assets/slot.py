@@ -1,4 +1,9 @@
+import common.utils as cutils
+
+
 class Slot(object):
+    __slots__ = ('_slot_id', '_type')
+
     def __init__(self, **kwargs):
         self._slot_id = None
         self._type = kwargs.get('type', None)
@@ -14,5 +19,11 @@ class Slot(object):
         if 'path' in params:
             self._slot_id = params['path']
 
+    def __getstate__(self):
+        return cutils.get_slots_state(self)
+
+    def __setstate__(self, state):
+        cutils.set_slots_state(self, state)
+
     def __str__(self):
         return self._slot_id
@@ -0,0 +1,154 @@
+"""
+    Memory benchmark for loaded assets.
+
+    Builds a large synthetic show, loads every asset in it and compares
+    the memory footprint of the current (compact) object layout against
+    the previous layout, where every object carried a __dict__, every
+    Asset/AssetVersion its own name generator holding a copy of the name
+    rules and the Store kept a list of full path strings per version.
+    Both measurements include the Store data the objects are loaded from.
+
+    Usage (from this directory):
+        python benchmark_memory.py [sequences] [shots] [versions]
+"""
+import sys
+import copy
+import json
+import common.path as cpath
+from pipeline.core.assets import asset, constants, slot, utils
+from pipeline.database.store import Store
+
+CHARACTERS = ['david', 'brad', 'tintin', 'haddock']
+FILES_PER_VERSION = 4
+
+
+def synthetic_show(sequences, shots, versions):
+    data = {}
+    for sq in range(sequences):
+        for sh in range(shots):
+            for char in CHARACTERS:
+                slot_ = "PROJECT:tintin/SEQUENCE:sq{sq}/SHOT:s{sh}/" \
+                        "OBJECT_TYPE:char/OBJECT:{char}/ASSET:animexport" \
+                        .format(sq=sq, sh=sh, char=char)
+                root = "/project/sq{sq}/s{sh}/char/{char}/anim_export/" \
+                       .format(sq=sq, sh=sh, char=char)
+                data[slot_] = {
+                    'type': constants.CONTENT_TYPE.File,
+                    'versions': dict(
+                        (str(v), {
+                            'contents': ["{}{}{}_part{}.mc".format(root, char, v, f)
+                                         for f in range(FILES_PER_VERSION)],
+                            'dependencies': []
+                        }) for v in range(1, versions + 1)
+                    )
+                }
+    # Round trip so that strings are what a parsed database file holds.
+    return json.loads(json.dumps(data))
+
+
+class _LegacyNameGenerator(object):
+    def __init__(self, asset_, name_rules):
+        self._name_rules = copy.deepcopy(name_rules)
+        self._asset = asset_
+
+
+class _LegacySlot(object):
+    def __init__(self, type_, path):
+        self._slot_id = path
+        self._type = type_
+
+
+class _LegacyContainer(object):
+    def __init__(self, contents):
+        self._type = constants.CONTENT_TYPE.File
+        self._contents = contents
+
+
+class _LegacyAsset(object):
+    def __init__(self, slot_, name_rules):
+        self._name = None
+        self._name_generator = _LegacyNameGenerator(self, name_rules)
+        self._slot = slot_
+        self._versions = []
+        self._latest_version = 0
+        self._metadata = {}
+
+
+class _LegacyAssetVersion(object):
+    def __init__(self, asset_, version, contents, name_rules):
+        self._name = None
+        self._name_generator = _LegacyNameGenerator(self, name_rules)
+        self._asset = asset_
+        self._version = version
+        self._dependencies = []
+        self._dependencies_loaded = False
+        self._container = _LegacyContainer(contents)
+
+
+def load_legacy(data):
+    name_rules = utils.shared_name_generator(utils.AssetNameGenerator)._name_rules
+    assets = []
+    for path, slot_data in data.items():
+        asset_ = _LegacyAsset(_LegacySlot(slot_data['type'], path), name_rules)
+        for version, version_data in sorted(slot_data['versions'].items()):
+            asset_._versions.append(
+                _LegacyAssetVersion(asset_, int(version),
+                                    version_data['contents'],
+                                    name_rules)
+            )
+        assets.append(asset_)
+    return assets
+
+
+def load_compact(data):
+    return [asset.Asset(slot.Slot(type=slot_data['type'], path=path))
+            for path, slot_data in data.items()]
+
+
+def deep_sizeof(obj, seen=None):
+    """
+    Approximate number of bytes reachable from obj. Objects shared
+    between several owners are only counted once.
+    """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen or isinstance(obj, type):
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += deep_sizeof(key, seen) + deep_sizeof(value, seen)
+        return size
+    if isinstance(obj, (list, tuple, set)):
+        return size + sum(deep_sizeof(x, seen) for x in obj)
+    if hasattr(obj, '__dict__'):
+        size += deep_sizeof(vars(obj), seen)
+    for cls in type(obj).__mro__:
+        for attr in getattr(cls, '__slots__', ()):
+            if hasattr(obj, attr):
+                size += deep_sizeof(getattr(obj, attr), seen)
+    return size
+
+
+def main(sequences=20, shots=20, versions=10):
+    legacy_data = synthetic_show(sequences, shots, versions)
+    legacy = load_legacy(legacy_data)
+    legacy_size = deep_sizeof([legacy_data, legacy])
+    del legacy, legacy_data
+
+    data = synthetic_show(sequences, shots, versions)
+    Store.load_data(data)
+    compact = load_compact(data)
+    compact_size = deep_sizeof([data, compact, cpath._path_prefixes])
+
+    num_versions = len(data) * versions
+    print("Synthetic show: {} assets, {} versions, {} files"
+          .format(len(data), num_versions, num_versions * FILES_PER_VERSION))
+    print("  before: {:>12,} bytes".format(legacy_size))
+    print("  after : {:>12,} bytes".format(compact_size))
+    print("  saved : {:.1f}%".format(100.0 * (legacy_size - compact_size) / legacy_size))
+
+
+if __name__ == "__main__":
+    main(*[int(x) for x in sys.argv[1:]])
@@ -1,3 +1,9 @@
+import gc
+import os
+import pickle
+import json
+import shutil
+import tempfile
 import unittest
 from pipeline.core.assets import asset, constants, slot
 from pipeline.database.store import Store
@@ -13,6 +19,14 @@ class SlotTestCase(unittest.TestCase):
                           type=constants.CONTENT_TYPE.File)
         self.assertTrue(str(slot_) == path)
 
+    def test_pickle_slot(self):
+        path = "PROJECT:tintin/GLOBALOBJECT_TYPE:characters/" \
+               "GLOBALOBJECT:brad/ASSET:rig"
+        slot_ = pickle.loads(pickle.dumps(
+            slot.Slot(path=path, type=constants.CONTENT_TYPE.File), 0))
+        self.assertEqual(slot_.id(), path)
+        self.assertEqual(slot_.type(), constants.CONTENT_TYPE.File)
+
 
 class AssetsTestCase(unittest.TestCase):
     def setUp(self):
@@ -67,6 +81,149 @@ class AssetsTestCase(unittest.TestCase):
         self.assertEqual(asset_version.slot_type(), constants.CONTENT_TYPE.File)
         self.assertEqual(asset_version.contents(), contents)
 
+    def test_pickle_asset(self):
+        asset_ = pickle.loads(pickle.dumps(asset.Asset(self.existing_slot), 0))
+        self.assertEqual(asset_.slot(), str(self.existing_slot))
+        self.assertEqual(asset_.version(2).name(),
+                         'sq100_s10_char_david_animexport_v2')
+        self.assertEqual(len(asset_.version(1).contents()), 2)
+
+    def test_compact_layout(self):
+        asset_ = asset.Asset(self.existing_slot)
+        asset_version = asset_.version(1)
+        self.assertFalse(hasattr(asset_, '__dict__'))
+        self.assertFalse(hasattr(asset_version, '__dict__'))
+        self.assertFalse(hasattr(self.existing_slot, '__dict__'))
+        self.assertTrue(asset_._name_generator is
+                        asset_version._name_generator)
+
+
+class IncrementalReloadTestCase(unittest.TestCase):
+    def setUp(self):
+        path = "PROJECT:tintin/SEQUENCE:sq100/SHOT:s10/OBJECT_TYPE:char/" \
+               "OBJECT:david/ASSET:animexport"
+        self.existing_slot = slot.Slot(path=path,
+                                       type=constants.CONTENT_TYPE.File)
+        self.tmp_dir = tempfile.mkdtemp()
+        self.journal = os.path.join(self.tmp_dir, "journal.jsonl")
+        self.events = []
+        Store.load_data(TEST_DATA_FILE, journal=self.journal)
+        Store.subscribe(self._on_change)
+
+    def tearDown(self):
+        Store.unsubscribe(self._on_change)
+        Store.load_data(TEST_DATA_FILE)
+        shutil.rmtree(self.tmp_dir)
+
+    def _on_change(self, slot_, version):
+        self.events.append((slot_, version))
+
+    def _commit(self, version, contents, partial=False):
+        record = json.dumps({"slot": self.existing_slot.id(),
+                             "type": constants.CONTENT_TYPE.File,
+                             "version": version,
+                             "contents": contents,
+                             "dependencies": []})
+        with open(self.journal, "a") as journal:
+            journal.write(record if partial else record + "\n")
+
+    def test_refresh_journal(self):
+        asset_ = asset.Asset(self.existing_slot)
+        self.assertEqual(Store.refresh(), [])
+
+        contents = ['/project/sq100/s10/char/david/anim_export/david5_body.mc']
+        self._commit(3, contents)
+        self.assertEqual(Store.refresh(), [(self.existing_slot.id(), 3)])
+        self.assertEqual(self.events, [(self.existing_slot.id(), 3)])
+        self.assertEqual(asset_.latest_version(), 3)
+        self.assertEqual(asset_.version(3).contents(), contents)
+
+        # Already applied records are not applied again
+        self.assertEqual(Store.refresh(), [])
+
+    def test_refresh_partial_record(self):
+        self._commit(3, ['/project/file.mc'], partial=True)
+        self.assertEqual(Store.refresh(), [])
+        with open(self.journal, "a") as journal:
+            journal.write("\n")
+        self.assertEqual(Store.refresh(), [(self.existing_slot.id(), 3)])
+
+    def test_refresh_invalid_record(self):
+        with open(self.journal, "a") as journal:
+            journal.write("{not json\n")
+        self._commit(3, ['/project/file.mc'])
+        self.assertEqual(Store.refresh(), [(self.existing_slot.id(), 3)])
+        self.assertEqual(Store.refresh(), [])
+
+    def test_refresh_failing_subscriber(self):
+        def failing(slot_, version):
+            raise RuntimeError
+        Store.unsubscribe(self._on_change)
+        Store.subscribe(failing)
+        Store.subscribe(self._on_change)
+        try:
+            self._commit(3, ['/project/file3.mc'])
+            self._commit(4, ['/project/file4.mc'])
+            Store.refresh()
+        finally:
+            Store.unsubscribe(failing)
+        self.assertEqual(self.events, [(self.existing_slot.id(), 3),
+                                       (self.existing_slot.id(), 4)])
+
+    def test_live_assets_released(self):
+        asset_ = asset.Asset(self.existing_slot)
+        self.assertTrue(self.existing_slot.id() in asset._live_assets)
+        del asset_
+        gc.collect()
+        self.assertFalse(self.existing_slot.id() in asset._live_assets)
+
+    def test_refresh_changed_version(self):
+        asset_ = asset.Asset(self.existing_slot)
+        contents = ['/project/sq100/s10/char/david/anim_export/fixed.mc']
+        self._commit(1, contents)
+        Store.refresh()
+        self.assertEqual(len(asset_.versions()), 2)
+        self.assertEqual(asset_.version(1).contents(), contents)
+
+    def test_refresh_source_and_journal(self):
+        source = os.path.join(self.tmp_dir, "data.json")
+        data = json.load(open(TEST_DATA_FILE, "r"))
+        json.dump(data, open(source, "w"))
+        Store.load_data(source, journal=self.journal)
+        asset_ = asset.Asset(self.existing_slot)
+
+        self._commit(3, ['/project/file3.mc'])
+        self.assertEqual(Store.refresh(), [(self.existing_slot.id(), 3)])
+
+        # Journal versions survive a reload of the source
+        os.utime(source, (0, 0))
+        self.assertEqual(Store.refresh(), [])
+        self.assertEqual(sorted(Store.get_versions_data(self.existing_slot.id())),
+                         [1, 2, 3])
+
+        # Versions removed from the source are published
+        del data['data'][self.existing_slot.id()]['versions']['2']
+        json.dump(data, open(source, "w"))
+        os.utime(source, (1, 1))
+        self.assertEqual(Store.refresh(), [(self.existing_slot.id(), 2)])
+        self.assertEqual([x.version() for x in asset_.versions()], [1, 3])
+        self.assertEqual(asset_.latest_version(), 3)
+
+    def test_refresh_source_mtime(self):
+        source = os.path.join(self.tmp_dir, "data.json")
+        data = json.load(open(TEST_DATA_FILE, "r"))
+        json.dump(data, open(source, "w"))
+        Store.load_data(source)
+        self.assertEqual(Store.refresh(), [])
+
+        versions = data['data'][self.existing_slot.id()]['versions']
+        versions['3'] = {'contents': ['/project/file.mc'], 'dependencies': []}
+        json.dump(data, open(source, "w"))
+        os.utime(source, (0, 0))
+        self.assertEqual(Store.refresh(), [(self.existing_slot.id(), 3)])
+        self.assertEqual(Store.get_content_data(self.existing_slot.id(), 3),
+                         ['/project/file.mc'])
+
 
 if __name__ == "__main__":
     import logging
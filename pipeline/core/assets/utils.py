@@ -7,6 +7,7 @@ from .exceptions import TokenNotFoundException
 
 logger = logging.getLogger(__name__)
 NAME_RULE_CONFIG = os.path.abspath("../config/asset_name_rules.json")
+_shared_generators = {}
 
 
 class NameGenerator(object):
@@ -14,9 +15,12 @@ class NameGenerator(object):
     Abstract class for name generators.
 
     Name generators are used to come up with names for pipeline objects
-    based on certain pre-configured set of rules.
+    based on certain pre-configured set of rules. Generators do not
+    hold on to the item being named, so a single instance can be
+    shared (see shared_name_generator).
     """
     __metaclass__ = abc.ABCMeta
+    __slots__ = ('_name_rules',)
 
     def __init__(self, *args, **kwargs):
         config_file = os.environ.get('NAME_RULE_CONFIG', None)
@@ -28,7 +32,7 @@ class NameGenerator(object):
         self._name_rules = json.load(open(config_file, 'r'))
 
     @abc.abstractmethod
-    def generate_name(self):
+    def generate_name(self, item):
         raise NotImplementedError
 
 
@@ -40,20 +44,15 @@ class AssetNameGenerator(NameGenerator):
     and concatenating them into a string. The rules for grabbing
     specific token values are configured in NAME_RULE_CONFIG.
     """
+    __slots__ = ()
 
-    def __init__(self, *args, **kwargs):
-        super(AssetNameGenerator, self).__init__(args, kwargs)
-        if len(args) > 0:
-            self._asset = args[0]
-
-        if not self._asset:
-            logger.error("Initialization failed as asset was not given!")
+    def generate_name(self, item):
+        if item is None:
+            logger.error("Name generation failed as asset was not given!")
             return
-
-    def generate_name(self):
         try:
-            return "_".join(slot_parser(self._asset.slot(), x)
-                            for x in self._get_tokens(self._asset.slot()))
+            return "_".join(slot_parser(item.slot(), x)
+                            for x in self._get_tokens(item.slot()))
         except TokenNotFoundException:
             logger.error("Name generation failed! "
                          "Please check the name rule config.")
@@ -71,13 +70,22 @@ class AssetNameGenerator(NameGenerator):
         return re_tokens
 
 
+def shared_name_generator(generator_class):
+    """
+    Return the single, shared instance of the given name generator class.
+    :param generator_class: NameGenerator subclass
+    :return: Name generator object
+    """
+    generator = _shared_generators.get(generator_class, None)
+    if generator is None:
+        generator = generator_class()
+        _shared_generators[generator_class] = generator
+    return generator
+
+
 def slot_parser(slot, token):
     m = re.match(".*\/{}:([a-z0-9]+)".format(token), slot)
     if m:
         return m.groups()[0]
     logger.warning("Token {} not found in {}".format(token, slot))
     raise TokenNotFoundException
-
-
-
-
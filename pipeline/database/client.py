@@ -0,0 +1,194 @@
+"""
+    Client for the local Store query server (see server.py).
+
+    StoreClient answers the same query methods as Store by forwarding
+    them to the server that owns the data. Connections are pooled so
+    that threads of a tool can query concurrently, and several queries
+    can be batched into a single round trip.
+
+    Ex:
+        client = StoreClient("/tmp/pipeline_store.sock")
+        type_, versions = client.batch([('get_type_data', (slot,)),
+                                        ('get_versions_data', (slot,))])
+"""
+import json
+import Queue
+import socket
+import logging
+import threading
+from .exceptions import StoreQueryException
+
+logger = logging.getLogger(__name__)
+
+
+class _Connection(object):
+    def __init__(self, socket_path, timeout=None):
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.settimeout(timeout)
+        self._socket.connect(socket_path)
+        self._rfile = self._socket.makefile('rb')
+        # Set once a request went through, a failure afterwards may just
+        # mean the server was restarted since.
+        self.used = False
+
+    def send(self, payload):
+        self._socket.sendall(json.dumps(payload) + "\n")
+
+    def receive(self):
+        line = self._rfile.readline()
+        if not line:
+            raise socket.error("Connection closed by the server")
+        return json.loads(line)
+
+    def close(self):
+        self._rfile.close()
+        self._socket.close()
+
+
+class StoreClient(object):
+    def __init__(self, socket_path, pool_size=4, timeout=30.0):
+        """
+        @:param socket_path: Unix socket the server is listening on
+        @:param pool_size: maximum number of open connections
+        @:param timeout: seconds to wait for the server to answer a request,
+                         None waits forever
+        """
+        self._socket_path = socket_path
+        self._pool_size = pool_size
+        self._timeout = timeout
+        self._pool = Queue.LifoQueue()
+        self._num_connections = 0
+        self._lock = threading.Lock()
+
+    def get_entries(self, slot):
+        return self.call('get_entries', slot)
+
+    def get_type_data(self, slot):
+        return self.call('get_type_data', slot)
+
+    def get_versions_data(self, slot):
+        return self.call('get_versions_data', slot)
+
+    def get_version_data(self, slot, version):
+        return self.call('get_version_data', slot, version)
+
+    def get_dependency_data(self, slot, version):
+        return self.call('get_dependency_data', slot, version)
+
+    def get_content_data(self, slot, version):
+        return self.call('get_content_data', slot, version)
+
+    def changes(self, since=None):
+        """
+        Changes applied by the server since the given position of its
+        change feed.
+        :param since: position returned by a previous call, None to get
+                      the current position
+        :return: (new position, list of (slot, version), resync). resync is
+                 True when changes were missed, either because the client
+                 fell too far behind or because the server was restarted.
+        """
+        position, changes, resync = self.call('changes', since)
+        return position, [tuple(x) for x in changes], resync
+
+    def call(self, method, *args):
+        return self.batch([(method, args)])[0]
+
+    def batch(self, calls):
+        """
+        Send several queries in a single round trip.
+        :param calls: list of (method name, args tuple)
+        :return: list of results in the order of calls
+        """
+        requests = [{'id': i, 'method': method, 'args': list(args)}
+                    for i, (method, args) in enumerate(calls)]
+        while True:
+            connection = self._acquire()
+            succeeded = False
+            try:
+                connection.send(requests)
+                responses = connection.receive()
+                connection.used = True
+                succeeded = True
+                break
+            except socket.timeout as e:
+                logger.error("Store query timed out on {}: {}"
+                             .format(self._socket_path, e))
+                raise StoreQueryException
+            except socket.error as e:
+                # Queries have no side effects, retry on a new connection
+                # when a pooled one went stale.
+                if connection.used:
+                    logger.info("Reconnecting to {}: {}"
+                                .format(self._socket_path, e))
+                    continue
+                logger.error("Store query failed on {}: {}"
+                             .format(self._socket_path, e))
+                raise StoreQueryException
+            except (ValueError, TypeError) as e:
+                logger.error("Store query failed on {}: {}"
+                             .format(self._socket_path, e))
+                raise StoreQueryException
+            finally:
+                # The state of a connection that failed mid request is unknown
+                if succeeded:
+                    self._release(connection)
+                else:
+                    self._discard(connection)
+
+        results = [None] * len(requests)
+        for response in responses:
+            if 'error' in response:
+                logger.error("Store query {} failed: {}"
+                             .format(response.get('id', None),
+                                     response['error']))
+                raise StoreQueryException
+            results[response['id']] = self._convert(
+                calls[response['id']][0], response['result'])
+        return results
+
+    def close(self):
+        while True:
+            try:
+                self._discard(self._pool.get_nowait())
+            except Queue.Empty:
+                return
+
+    def _convert(self, method, result):
+        # Json only allows string keys, versions are integers in Store.
+        if method == 'get_versions_data' and result is not None:
+            return dict((int(k), v) for k, v in result.items())
+        return result
+
+    def _acquire(self):
+        while True:
+            try:
+                return self._pool.get_nowait()
+            except Queue.Empty:
+                pass
+            with self._lock:
+                if self._num_connections < self._pool_size:
+                    self._num_connections += 1
+                    break
+            # Wait for a connection to be released. Discarded connections
+            # free up room in the pool, so check again now and then.
+            try:
+                return self._pool.get(timeout=1)
+            except Queue.Empty:
+                continue
+        try:
+            return _Connection(self._socket_path, self._timeout)
+        except socket.error as e:
+            with self._lock:
+                self._num_connections -= 1
+            logger.error("Could not connect to the Store server on {}: {}"
+                         .format(self._socket_path, e))
+            raise StoreQueryException
+
+    def _release(self, connection):
+        self._pool.put(connection)
+
+    def _discard(self, connection):
+        connection.close()
+        with self._lock:
+            self._num_connections -= 1
@@ -0,0 +1,8 @@
+class StoreQueryException(Exception):
+    def __init__(self):
+        super(StoreQueryException, self).__init__()
+
+
+class StoreServerException(Exception):
+    def __init__(self):
+        super(StoreServerException, self).__init__()
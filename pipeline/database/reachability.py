@@ -0,0 +1,253 @@
+"""
+    Reachability analysis over the versions in the Store, used to find
+    asset versions that can be cleaned up from storage.
+
+    The Store only keeps forward edges (dependencies, and the contents of
+    Asset type slots that bundle other versions). Starting from a set of
+    root versions (latest versions, tagged/delivered versions, recent
+    versions) everything reachable through those edges is marked, the
+    remaining versions are unreferenced.
+
+    Versions are numbered into a compact graph (integer arrays, edges in
+    compressed sparse row layout) in one pass over the Store data, so that
+    marking is a single linear pass even for millions of versions. The
+    versions of a slot are numbered contiguously and in order, so a node
+    is found from its slot offset and a binary search over the versions.
+    Unreferenced versions are reported lazily, one at a time. Files that
+    are still used by a reachable version are reported separately, as
+    deleting them would not free any space. Files are told apart by the
+    hash of their (directory prefix, leaf) pair kept in sorted integer
+    arrays, so paths are never held in memory. A hash collision can only
+    make a file count as shared, or be counted once for two files, so the
+    reclaimable size is never overstated.
+
+    Optional version record fields used for roots:
+        "tags" -> list of strings, ex: ["delivered"]
+        "time" -> commit time in seconds since the epoch
+"""
+import os
+import time
+import array
+import bisect
+import logging
+import collections
+from common.path import CompactPathList
+from .store import Store
+
+logger = logging.getLogger(__name__)
+
+UnreferencedVersion = collections.namedtuple(
+    'UnreferencedVersion', ['slot', 'version', 'size', 'shared_size']
+)
+
+
+class ReachabilityGraph(object):
+    def __init__(self, data=None):
+        """
+        @:param data: slot data in the Store format. Defaults to the data
+                      currently loaded in the Store.
+        """
+        self._data = Store._data if data is None else data
+        self._slots = []
+        self._slot_index = {}
+        self._slot_offsets = array.array('l', [0])
+        self._node_version = array.array('l')
+        self._edge_offsets = array.array('l', [0])
+        self._edge_targets = array.array('l')
+        self._marked = None
+        self._live_keys = None
+        self._dead_duplicate_keys = None
+        self._build()
+
+    def num_versions(self):
+        return len(self._node_version)
+
+    def mark(self, latest=True, tags=None, newer_than_days=None, roots=None):
+        """
+        Mark every version reachable from the roots.
+        :param latest: use the latest version of every slot as root
+        :param tags: use versions carrying any of these tags as roots
+        :param newer_than_days: use versions committed in the last N days
+                                as roots
+        :param roots: extra (slot, version) roots
+        :return: number of reachable versions
+        """
+        marked = bytearray(self.num_versions())
+        stack = list(self._roots(latest, tags, newer_than_days, roots))
+        offsets = self._edge_offsets
+        targets = self._edge_targets
+        reachable = 0
+        while stack:
+            node = stack.pop()
+            if marked[node]:
+                continue
+            marked[node] = 1
+            reachable += 1
+            for i in range(offsets[node], offsets[node + 1]):
+                if not marked[targets[i]]:
+                    stack.append(targets[i])
+        self._marked = marked
+        self._live_keys = self._sorted_keys(marked=True)
+        # Only files referenced by several unreferenced versions need to be
+        # remembered while sweeping, to count them once.
+        dead_keys = self._sorted_keys(marked=False)
+        self._dead_duplicate_keys = array.array('l')
+        for i in range(1, len(dead_keys)):
+            if dead_keys[i] == dead_keys[i - 1]:
+                self._dead_duplicate_keys.append(dead_keys[i])
+        del dead_keys
+        logger.info("{} of {} versions reachable"
+                    .format(reachable, self.num_versions()))
+        return reachable
+
+    def sweep(self):
+        """
+        Generate the versions left unmarked by the last mark() together
+        with the byte size of their files that can be freed, and of their
+        files still used by reachable versions. Files shared by several
+        unreferenced versions are only counted for the first one.
+        :return: generator of UnreferencedVersion
+        """
+        if self._marked is None:
+            self.mark()
+        counted = set()
+        for slot, node in self._nodes(marked=False):
+            version = self._node_version[node]
+            size = 0
+            shared_size = 0
+            for prefix, leaf in self._file_parts(slot, version):
+                key = hash((prefix, leaf))
+                if _contains(self._dead_duplicate_keys, key):
+                    if key in counted:
+                        continue
+                    counted.add(key)
+                if _contains(self._live_keys, key):
+                    shared_size += self._file_size(prefix + leaf)
+                else:
+                    size += self._file_size(prefix + leaf)
+            yield UnreferencedVersion(slot, version, size, shared_size)
+
+    def report(self, stream):
+        """
+        Write unreferenced versions to the stream, one per line, as they
+        are found.
+        :return: (number of unreferenced versions, total size in bytes
+                  that can be freed)
+        """
+        count = 0
+        total_size = 0
+        for item in self.sweep():
+            stream.write("{}\t{}\t{}\t{}\n".format(item.slot, item.version,
+                                                 item.size, item.shared_size))
+            count += 1
+            total_size += item.size
+        return count, total_size
+
+    def _build(self):
+        # First pass numbers the versions, second pass resolves the edges.
+        # Versions are numbered in increasing order per slot.
+        for slot, slot_data in self._data.items():
+            self._slot_index[slot] = len(self._slots)
+            self._slots.append(slot)
+            self._node_version.extend(sorted(int(x) for x in
+                                             slot_data.get('versions', {})))
+            self._slot_offsets.append(len(self._node_version))
+
+        for slot, node in self._nodes():
+            version_data = self._version_data(slot, self._node_version[node])
+            for ref in self._references(self._data[slot], version_data):
+                target = self._node(ref[0], ref[1])
+                if target is None:
+                    logger.debug("Missing reference {}->{} from {}->{}"
+                                 .format(ref[0], ref[1], slot,
+                                         self._node_version[node]))
+                    continue
+                self._edge_targets.append(target)
+            self._edge_offsets.append(len(self._edge_targets))
+
+    def _references(self, slot_data, version_data):
+        for dep in version_data.get('dependencies', []):
+            yield dep
+        if slot_data.get('type', None) == 'Asset':
+            for item in version_data.get('contents', []):
+                if isinstance(item, (list, tuple)) and len(item) == 2:
+                    yield item
+
+    def _roots(self, latest, tags, newer_than_days, roots):
+        tags = set(tags or [])
+        since = None if newer_than_days is None \
+            else time.time() - newer_than_days * 24 * 60 * 60
+        for slot_index, slot in enumerate(self._slots):
+            start = self._slot_offsets[slot_index]
+            end = self._slot_offsets[slot_index + 1]
+            if latest and end > start:
+                yield end - 1
+            if not tags and since is None:
+                continue
+            for node in range(start, end):
+                version_data = self._version_data(slot, self._node_version[node])
+                if tags and tags.intersection(version_data.get('tags', [])):
+                    yield node
+                elif since is not None and \
+                        version_data.get('time', 0) >= since:
+                    yield node
+        for slot, version in roots or []:
+            node = self._node(slot, version)
+            if node is not None:
+                yield node
+
+    def _nodes(self, marked=None):
+        # (slot, node) of all nodes, or of the (un)marked ones only.
+        for slot_index, slot in enumerate(self._slots):
+            for node in range(self._slot_offsets[slot_index],
+                              self._slot_offsets[slot_index + 1]):
+                if marked is None or bool(self._marked[node]) == marked:
+                    yield slot, node
+
+    def _node(self, slot, version):
+        slot_index = self._slot_index.get(slot, None)
+        if slot_index is None:
+            return None
+        start = self._slot_offsets[slot_index]
+        end = self._slot_offsets[slot_index + 1]
+        version = int(version)
+        node = bisect.bisect_left(self._node_version, version, start, end)
+        if node < end and self._node_version[node] == version:
+            return node
+        return None
+
+    def _version_data(self, slot, version):
+        versions_data = self._data[slot].get('versions', {})
+        version_data = versions_data.get(str(version), None)
+        if version_data is None:
+            version_data = versions_data.get(version, {})
+        return version_data
+
+    def _sorted_keys(self, marked):
+        return array.array('l', sorted(
+            hash(parts) for slot, node in self._nodes(marked=marked)
+            for parts in self._file_parts(slot, self._node_version[node])
+        ))
+
+    def _file_parts(self, slot, version):
+        if self._data[slot].get('type', None) != 'File':
+            return
+        contents = self._version_data(slot, version).get('contents', [])
+        if isinstance(contents, CompactPathList):
+            for parts in contents.parts():
+                yield parts
+            return
+        for path in contents:
+            prefix, sep, leaf = path.rpartition('/')
+            yield prefix + sep, leaf
+
+    def _file_size(self, path):
+        if os.path.isfile(path):
+            return os.path.getsize(path)
+        logger.debug("Missing file {}".format(path))
+        return 0
+
+
+def _contains(sorted_keys, key):
+    index = bisect.bisect_left(sorted_keys, key)
+    return index < len(sorted_keys) and sorted_keys[index] == key
@@ -0,0 +1,184 @@
+"""
+    Local Store query server.
+
+    A single process owns the Store data and answers the Store query
+    methods over a Unix socket, so that the processes of a node share
+    one copy of the database instead of each loading their own.
+    Clients either use StoreClient directly or call Store.connect() so
+    that existing code queries the server transparently.
+
+    Protocol: every request line is a json list of
+    {"id": .., "method": .., "args": [..]} queries, answered with one json
+    line holding a list of {"id": .., "result": ..} or
+    {"id": .., "error": ..}. Requests on a connection are answered in
+    order, so clients may pipeline them.
+
+    Usage:
+        python -m pipeline.database.server --socket /tmp/pipeline_store.sock
+                                           --source data.json
+                                           [--journal journal.jsonl]
+"""
+import os
+import json
+import stat
+import uuid
+import socket
+import logging
+import argparse
+import threading
+import SocketServer
+from .store import Store
+from .exceptions import StoreServerException
+
+logger = logging.getLogger(__name__)
+
+QUERY_METHODS = ('get_entries', 'get_type_data', 'get_versions_data',
+                 'get_version_data', 'get_dependency_data', 'get_content_data')
+# Number of changes kept in the change feed. Clients that fall further
+# behind only get the most recent ones.
+MAX_CHANGES = 100000
+
+
+class _QueryHandler(SocketServer.StreamRequestHandler):
+    def handle(self):
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            try:
+                requests = json.loads(line)
+            except ValueError as e:
+                logger.warning("Invalid request: {}".format(e))
+                return
+            if isinstance(requests, list):
+                responses = [self.server.answer(x) for x in requests]
+            else:
+                responses = [json.dumps({
+                    'id': None,
+                    'error': "Request must be a list of queries"
+                })]
+            self.wfile.write("[{}]\n".format(",".join(responses)))
+            self.wfile.flush()
+
+
+class StoreServer(SocketServer.ThreadingMixIn, SocketServer.UnixStreamServer):
+    """
+    Serves the data currently loaded in the Store, whatever it was loaded
+    from. Store.refresh() is run on behalf of clients polling for changes
+    and the changes are kept in a feed each client reads at its own pace.
+
+    Store.refresh() modifies the Store data in place, so queries and their
+    serialisation are run under the same lock as refreshes.
+    """
+    daemon_threads = True
+
+    def __init__(self, socket_path):
+        _remove_stale_socket(socket_path)
+        SocketServer.UnixStreamServer.__init__(self, socket_path, _QueryHandler)
+        self._socket_path = socket_path
+        # Identifies this server in change feed positions, so that clients
+        # notice a restart.
+        self._id = uuid.uuid4().hex
+        self._changes = []
+        self._changes_start = 0
+        self._lock = threading.Lock()
+
+    def answer(self, request):
+        """
+        :return: json encoded response to a single query
+        """
+        if not isinstance(request, dict):
+            return json.dumps({'id': None, 'error': "Invalid query"})
+        response = {'id': request.get('id', None)}
+        method = request.get('method', None)
+        args = request.get('args', [])
+        with self._lock:
+            try:
+                if method in QUERY_METHODS:
+                    response['result'] = getattr(Store, method)(*args)
+                elif method == 'changes':
+                    response['result'] = self._changes_since(*args)
+                else:
+                    response['error'] = "Unknown method {}".format(method)
+                # Contents are stored as CompactPathList objects
+                return json.dumps(response, default=list)
+            except Exception as e:
+                logger.exception("Query {}{} failed".format(method, args))
+                response.pop('result', None)
+                response['error'] = "{}: {}".format(type(e).__name__, e)
+                return json.dumps(response)
+
+    def _changes_since(self, since=None):
+        """
+        :param since: [server id, position] from a previous call, or None
+        :return: ([server id, position], changes, resync)
+        """
+        self._changes.extend(Store.refresh())
+        if len(self._changes) > MAX_CHANGES:
+            trim = len(self._changes) - MAX_CHANGES
+            del self._changes[:trim]
+            self._changes_start += trim
+        position = self._changes_start + len(self._changes)
+        if since is None:
+            return [self._id, position], [], False
+        server_id, since = since
+        if server_id != self._id or since > position:
+            logger.info("Client position is from another server, resync")
+            return [self._id, position], [], True
+        if since < self._changes_start:
+            logger.warning("Client fell behind the change feed, {} changes "
+                           "were dropped".format(self._changes_start - since))
+            return [self._id, position], [], True
+        return [self._id, position], \
+            self._changes[since - self._changes_start:], False
+
+    def server_close(self):
+        SocketServer.UnixStreamServer.server_close(self)
+        if os.path.exists(self._socket_path):
+            os.remove(self._socket_path)
+
+
+def _remove_stale_socket(socket_path):
+    if not os.path.exists(socket_path):
+        return
+    if not stat.S_ISSOCK(os.stat(socket_path).st_mode):
+        logger.error("Cannot listen on {}: it exists and is not a socket"
+                     .format(socket_path))
+        raise StoreServerException
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+    except socket.error:
+        logger.warning("Removing stale socket {}".format(socket_path))
+        os.remove(socket_path)
+        return
+    finally:
+        probe.close()
+    logger.error("A Store server is already listening on {}".format(socket_path))
+    raise StoreServerException
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Store query server")
+    parser.add_argument('--socket', required=True)
+    parser.add_argument('--source', required=True)
+    parser.add_argument('--journal', default=None)
+    args = parser.parse_args()
+    if not args.source.endswith(".json") or not os.path.isfile(args.source):
+        parser.error("--source must be an existing json database file: {}"
+                     .format(args.source))
+
+    logging.basicConfig(level=logging.INFO)
+    Store.load_data(args.source, journal=args.journal)
+    server = StoreServer(args.socket)
+    logger.info("Serving {} on {}".format(args.source, args.socket))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,22 @@
 import os
 import json
+import logging
+from common.path import CompactPathList
+from .client import StoreClient
+
+logger = logging.getLogger(__name__)
 
 
 class Store(object):
     __instance = None
     _data = {}
+    _source = None
+    _source_mtime = None
+    _journal = None
+    _journal_offset = 0
+    _subscribers = []
+    _client = None
+    _client_position = None
 
     def __new__(cls):
         if cls.__instance is None:
@@ -12,27 +24,231 @@ class Store(object):
         return cls.__instance
 
     @classmethod
-    def load_data(cls, source):
+    def load_data(cls, source, journal=None):
+        """
+        Load the whole database from the source.
+        :param source: data dict or path to a json database file. A data
+                       dict is used as is, the contents lists of its File
+                       versions are replaced in place by CompactPathLists.
+        :param journal: optional path to an append-only journal of commits
+                        (one json record per line, see _apply_record) that
+                        is replayed on top of the source and tracked by
+                        refresh()
+        """
+        cls.disconnect()
+        cls._source = None
+        cls._source_mtime = None
         if isinstance(source, dict):
             cls._data = source
         elif isinstance(source, str) and \
                 source.endswith(".json") and \
                 os.path.exists(source):
-            data_dict = json.load(open(source, "r"))
-            cls._data = data_dict.get('data', {})
+            cls._source = source
+            cls._source_mtime = os.path.getmtime(source)
+            cls._data = cls._read_source(source)
+        cls._compact_contents(cls._data)
+
+        cls._journal = journal
+        cls._journal_offset = 0
+        if journal is not None:
+            cls._read_journal()
+
+    @classmethod
+    def connect(cls, socket_path, pool_size=4, timeout=30.0):
+        """
+        Answer queries from a local Store server (see server.py) instead
+        of data loaded in this process.
+        :param socket_path: Unix socket the server is listening on
+        :param pool_size: maximum number of connections to the server
+        :param timeout: seconds to wait for an answer from the server
+        """
+        cls.disconnect()
+        cls._client = StoreClient(socket_path, pool_size=pool_size,
+                                  timeout=timeout)
+        cls._client_position, _, _ = cls._client.changes()
+
+    @classmethod
+    def disconnect(cls):
+        if cls._client is not None:
+            cls._client.close()
+        cls._client = None
+        cls._client_position = None
+
+    @classmethod
+    def refresh(cls):
+        """
+        Incrementally pick up new publishes instead of reloading everything.
+
+        New lines of the journal are applied if one is tracked, and the
+        json source is re-read only when its modification time changed, in
+        which case the journal is replayed on top of it. A (slot, version)
+        event is published to all subscribers for every version that was
+        added, changed or removed; subscribers look the version up in the
+        Store to tell which.
+        When connected to a server, the changes are read from the
+        server's change feed instead. If changes were missed, a single
+        (None, None) event is published, asking subscribers to reload
+        everything.
+        :return: list of (slot, version) changes that were applied
+        """
+        if cls._client is not None:
+            cls._client_position, changes, resync = \
+                cls._client.changes(cls._client_position)
+            if resync:
+                logger.warning("Missed changes from the Store server, "
+                               "requesting a full reload")
+                changes = [(None, None)]
+            for slot, version in changes:
+                cls._publish(slot, version)
+            return changes
+
+        changes = []
+        if cls._source is not None and os.path.exists(cls._source):
+            mtime = os.path.getmtime(cls._source)
+            if mtime != cls._source_mtime:
+                cls._source_mtime = mtime
+                changes.extend(cls._reload_source())
+        if cls._journal is not None:
+            changes.extend(cls._read_journal())
+        for slot, version in changes:
+            cls._publish(slot, version)
+        return changes
+
+    @classmethod
+    def subscribe(cls, callback):
+        """
+        Register a callback(slot, version) to the change feed.
+        A (None, None) event means everything has to be reloaded.
+        """
+        if callback not in cls._subscribers:
+            cls._subscribers.append(callback)
+
+    @classmethod
+    def unsubscribe(cls, callback):
+        if callback in cls._subscribers:
+            cls._subscribers.remove(callback)
+
+    @classmethod
+    def _publish(cls, slot, version):
+        for callback in list(cls._subscribers):
+            try:
+                callback(slot, version)
+            except Exception:
+                logger.exception("Change feed subscriber {} failed on {}->{}"
+                                 .format(callback, slot, version))
+
+    @classmethod
+    def _read_source(cls, source):
+        data_dict = json.load(open(source, "r"))
+        return data_dict.get('data', {})
+
+    @classmethod
+    def _reload_source(cls):
+        old_data = cls._data
+        cls._data = cls._read_source(cls._source)
+        cls._compact_contents(cls._data)
+        # Journal records are not part of the source, apply them again
+        if cls._journal is not None:
+            cls._journal_offset = 0
+            cls._read_journal()
+        return cls._diff_data(old_data, cls._data)
+
+    @classmethod
+    def _diff_data(cls, old_data, new_data):
+        changes = []
+        for slot in set(old_data) | set(new_data):
+            old_versions = old_data.get(slot, {}).get('versions', {})
+            new_versions = new_data.get(slot, {}).get('versions', {})
+            for key in set(old_versions) | set(new_versions):
+                if old_versions.get(key, None) != new_versions.get(key, None):
+                    changes.append((slot, int(key)))
+        return sorted(changes)
+
+    @classmethod
+    def _read_journal(cls):
+        if not os.path.exists(cls._journal):
+            return []
+        changes = []
+        with open(cls._journal, "r") as journal:
+            journal.seek(cls._journal_offset)
+            while True:
+                line = journal.readline()
+                # A partially written record is picked up by the next refresh.
+                if not line.endswith("\n"):
+                    break
+                if line.strip():
+                    try:
+                        changes.append(cls._apply_record(json.loads(line)))
+                    except (ValueError, KeyError, TypeError, AttributeError) as e:
+                        logger.error("Skipping invalid journal record at {}:{}: {}"
+                                     .format(cls._journal, cls._journal_offset, e))
+                cls._journal_offset += len(line)
+        return changes
+
+    @classmethod
+    def _apply_record(cls, record):
+        # Journal record:
+        # {"slot": .., "type": .., "version": .., "contents": [..],
+        #  "dependencies": [[slot, version], ..]}
+        slot = record['slot']
+        version = int(record['version'])
+        slot_data = cls._data.setdefault(
+            slot, {'type': record.get('type', None), 'versions': {}}
+        )
+        versions_data = slot_data.setdefault('versions', {})
+        version_data = {
+            'contents': record.get('contents', []),
+            'dependencies': record.get('dependencies', [])
+        }
+        versions_data[str(version)] = version_data
+        cls._compact_contents({slot: {'type': slot_data.get('type', None),
+                                      'versions': {0: version_data}}})
+        return slot, version
+
+    @classmethod
+    def _compact_contents(cls, data):
+        # File contents of a whole show share long directory prefixes.
+        # Store them as prefix compressed lists, the containers of
+        # loaded asset versions reference these lists directly.
+        for slot_data in data.values():
+            if slot_data.get('type', None) != 'File':
+                continue
+            for version_data in slot_data.get('versions', {}).values():
+                contents = version_data.get('contents', None)
+                if contents is not None and \
+                        not isinstance(contents, CompactPathList):
+                    version_data['contents'] = CompactPathList(contents)
+
+    @classmethod
+    def batch(cls, calls):
+        """
+        Run several queries, in a single round trip when connected to
+        a Store server.
+        :param calls: list of (query method name, args tuple)
+        :return: list of results in the order of calls
+        """
+        if cls._client is not None:
+            return cls._client.batch(calls)
+        return [getattr(cls, method)(*args) for method, args in calls]
 
     @classmethod
     def get_entries(cls, slot):
+        if cls._client is not None:
+            return cls._client.get_entries(slot)
         return cls._data.get(slot, None)
 
     @classmethod
     def get_type_data(cls, slot):
+        if cls._client is not None:
+            return cls._client.get_type_data(slot)
         slot_data = cls.get_entries(slot)
         if slot_data is not None:
             return slot_data.get('type', None)
 
     @classmethod
     def get_versions_data(cls, slot):
+        if cls._client is not None:
+            return cls._client.get_versions_data(slot)
         slot_data = cls.get_entries(slot)
         if slot_data is not None:
             versions_data = slot_data.get('versions', None)
@@ -50,12 +266,16 @@ class Store(object):
 
     @classmethod
     def get_version_data(cls, slot, version):
+        if cls._client is not None:
+            return cls._client.get_version_data(slot, version)
         versions_data = cls.get_versions_data(slot)
         if versions_data is not None:
             return versions_data.get(version, None)
 
     @classmethod
     def get_dependency_data(cls, slot, version):
+        if cls._client is not None:
+            return cls._client.get_dependency_data(slot, version)
         version_data = cls.get_version_data(slot, version)
         if version_data is not None:
             return version_data.get('dependencies', [])
@@ -63,6 +283,8 @@ class Store(object):
 
     @classmethod
     def get_content_data(cls, slot, version):
+        if cls._client is not None:
+            return cls._client.get_content_data(slot, version)
         version_data = cls.get_version_data(slot, version)
         if version_data is not None:
             return version_data.get('contents', [])
@@ -0,0 +1,114 @@
+import os
+import time
+import shutil
+import tempfile
+import unittest
+from StringIO import StringIO
+from pipeline.database.store import Store
+from pipeline.database.reachability import ReachabilityGraph
+
+MODEL = "PROJECT:tintin/GLOBALOBJECT_TYPE:characters/GLOBALOBJECT:david/ASSET:model"
+RIG = "PROJECT:tintin/GLOBALOBJECT_TYPE:characters/GLOBALOBJECT:david/ASSET:rig"
+LAYOUT = "PROJECT:tintin/SEQUENCE:sq100/SHOT:s10/OBJECT_TYPE:layout/" \
+         "OBJECT:main/ASSET:package"
+
+
+class ReachabilityTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.model_files = []
+        for i in range(1, 4):
+            path = os.path.join(self.tmp_dir, "david{}.abc".format(i))
+            with open(path, "w") as f:
+                f.write("x" * 10 * i)
+            self.model_files.append(path)
+
+        self.data = {
+            MODEL: {
+                "type": "File",
+                "versions": {
+                    "1": {"contents": [self.model_files[0]], "dependencies": []},
+                    "2": {"contents": [self.model_files[1]], "dependencies": []},
+                    "3": {"contents": [self.model_files[2]], "dependencies": []}
+                }
+            },
+            RIG: {
+                "type": "File",
+                "versions": {
+                    "1": {"contents": [], "dependencies": [[MODEL, 1]]},
+                    "2": {"contents": [], "dependencies": [[MODEL, 3]],
+                          "tags": ["delivered"]},
+                    "3": {"contents": [], "dependencies": [[MODEL, 3]]}
+                }
+            },
+            LAYOUT: {
+                "type": "Asset",
+                "versions": {
+                    "1": {"contents": [[RIG, 1]], "dependencies": []},
+                    "2": {"contents": [[RIG, 3]], "dependencies": []}
+                }
+            }
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_latest_roots(self):
+        graph = ReachabilityGraph(self.data)
+        self.assertEqual(graph.num_versions(), 8)
+        self.assertEqual(graph.mark(), 3)
+        unreferenced = set((x.slot, x.version, x.size) for x in graph.sweep())
+        self.assertEqual(unreferenced, set([(MODEL, 1, 10), (MODEL, 2, 20),
+                                            (RIG, 1, 0), (RIG, 2, 0),
+                                            (LAYOUT, 1, 0)]))
+
+    def test_package_contents(self):
+        graph = ReachabilityGraph(self.data)
+        graph.mark(latest=False, roots=[(LAYOUT, 1)])
+        unreferenced = set((x.slot, x.version) for x in graph.sweep())
+        self.assertFalse((RIG, 1) in unreferenced)
+        self.assertFalse((MODEL, 1) in unreferenced)
+
+    def test_tag_and_time_roots(self):
+        self.data[MODEL]["versions"]["2"]["time"] = time.time()
+        self.data[MODEL]["versions"]["1"]["time"] = time.time() - 100 * 86400
+        graph = ReachabilityGraph(self.data)
+        self.assertEqual(graph.mark(latest=False, tags=["delivered"],
+                                    newer_than_days=30), 3)
+
+    def test_shared_files(self):
+        self.data[MODEL]["versions"]["1"]["contents"].append(self.model_files[1])
+        self.data[MODEL]["versions"]["2"]["contents"].append(self.model_files[2])
+        graph = ReachabilityGraph(self.data)
+        graph.mark()
+        sizes = dict(((x.slot, x.version), (x.size, x.shared_size))
+                     for x in graph.sweep())
+        self.assertEqual(sizes[(MODEL, 1)], (30, 0))
+        self.assertEqual(sizes[(MODEL, 2)], (0, 30))
+
+    def test_shared_files_compacted(self):
+        self.data[MODEL]["versions"]["1"]["contents"].append(self.model_files[1])
+        self.data[MODEL]["versions"]["2"]["contents"].append(self.model_files[2])
+        Store._compact_contents(self.data)
+        graph = ReachabilityGraph(self.data)
+        graph.mark()
+        self.assertEqual(graph.report(StringIO()), (5, 30))
+        sizes = dict(((x.slot, x.version), (x.size, x.shared_size))
+                     for x in graph.sweep())
+        self.assertEqual(sizes[(MODEL, 2)], (0, 30))
+
+    def test_missing_reference(self):
+        self.data[RIG]["versions"]["1"]["dependencies"].append([MODEL, 7])
+        graph = ReachabilityGraph(self.data)
+        self.assertEqual(graph.mark(latest=False, roots=[(RIG, 1), (RIG, 9)]), 2)
+
+    def test_report(self):
+        graph = ReachabilityGraph(self.data)
+        graph.mark()
+        stream = StringIO()
+        self.assertEqual(graph.report(stream), (5, 30))
+        self.assertEqual(len(stream.getvalue().splitlines()), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
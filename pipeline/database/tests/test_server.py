@@ -0,0 +1,231 @@
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import tempfile
+import unittest
+import subprocess
+from pipeline.core.assets import asset, constants, slot
+from pipeline.database.store import Store
+from pipeline.database import server
+from pipeline.database.server import StoreServer
+from pipeline.database.client import StoreClient, _Connection
+from pipeline.database.exceptions import StoreQueryException, \
+                                        StoreServerException
+
+os.environ.setdefault('NAME_RULE_CONFIG', os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "..", "..", "core", "assets", "config", "asset_name_rules.json"
+))
+
+SLOT = "PROJECT:tintin/GLOBALOBJECT_TYPE:characters/GLOBALOBJECT:david/ASSET:rig"
+DATA = {
+    "data": {
+        SLOT: {
+            "type": "File",
+            "versions": {
+                "1": {"contents": ["/project/library/characters/david/rig/david1.rig"],
+                      "dependencies": []},
+                "2": {"contents": ["/project/library/characters/david/rig/david2.rig"],
+                      "dependencies": [[SLOT, 1]]}
+            }
+        }
+    }
+}
+
+
+class StoreServerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.tmp_dir, "store.sock")
+        self.journal = os.path.join(self.tmp_dir, "journal.jsonl")
+        self.source = os.path.join(self.tmp_dir, "data.json")
+        json.dump(DATA, open(self.source, "w"))
+        self.server = self._start_server()
+        self.client = StoreClient(self.socket_path, pool_size=2)
+
+    def _start_server(self, source=None):
+        root = os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                            "..", "..", ".."))
+        env = dict(os.environ, PYTHONPATH=root)
+        server_ = subprocess.Popen(
+            [sys.executable, "-m", "pipeline.database.server",
+             "--socket", self.socket_path,
+             "--source", source or self.source,
+             "--journal", self.journal],
+            env=env, stderr=open(os.devnull, "w")
+        )
+        for _ in range(100):
+            if server_.poll() is not None:
+                break
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.socket_path)
+                break
+            except socket.error:
+                time.sleep(0.05)
+            finally:
+                probe.close()
+        return server_
+
+    def _commit(self, version):
+        with open(self.journal, "a") as journal:
+            journal.write(json.dumps({"slot": SLOT, "type": "File",
+                                      "version": version, "contents": [],
+                                      "dependencies": []}) + "\n")
+
+    def _count_round_trips(self):
+        round_trips = []
+        batch = Store._client.batch
+
+        def counting_batch(calls):
+            round_trips.append(calls)
+            return batch(calls)
+        Store._client.batch = counting_batch
+        return round_trips
+
+    def tearDown(self):
+        self.client.close()
+        Store.load_data({})
+        self.server.terminate()
+        self.server.wait()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_queries(self):
+        self.assertEqual(self.client.get_type_data(SLOT), "File")
+        self.assertEqual(sorted(self.client.get_versions_data(SLOT)), [1, 2])
+        self.assertEqual(self.client.get_content_data(SLOT, 1),
+                         ["/project/library/characters/david/rig/david1.rig"])
+        self.assertEqual(self.client.get_dependency_data(SLOT, 2), [[SLOT, 1]])
+        self.assertEqual(self.client.get_entries("PROJECT:missing"), None)
+
+    def test_batch(self):
+        results = self.client.batch([('get_type_data', (SLOT,)),
+                                     ('get_version_data', (SLOT, 3)),
+                                     ('get_content_data', (SLOT, 2))])
+        self.assertEqual(results, [
+            "File", None, ["/project/library/characters/david/rig/david2.rig"]
+        ])
+
+    def test_unknown_method(self):
+        self.assertRaises(StoreQueryException, self.client.call, 'load_data', {})
+
+    def test_invalid_request(self):
+        connection = _Connection(self.socket_path)
+        connection.send({"method": "get_entries"})
+        self.assertTrue('error' in connection.receive()[0])
+        connection.send(["get_entries"])
+        self.assertTrue('error' in connection.receive()[0])
+        connection.close()
+
+    def test_connection_discarded_on_error(self):
+        client = StoreClient(self.socket_path, pool_size=1)
+        self.assertRaises(StoreQueryException,
+                          client.call, 'get_entries', object())
+        self.assertEqual(client._num_connections, 0)
+        self.assertEqual(client.get_type_data(SLOT), "File")
+        client.close()
+
+    def test_existing_socket_path(self):
+        self.assertRaises(StoreServerException, StoreServer, self.socket_path)
+        self.assertEqual(self.client.get_type_data(SLOT), "File")
+
+        path = os.path.join(self.tmp_dir, "data.json")
+        self.assertRaises(StoreServerException, StoreServer, path)
+        self.assertTrue(os.path.exists(path))
+
+    def test_change_feed_capped(self):
+        max_changes = server.MAX_CHANGES
+        server.MAX_CHANGES = 2
+        store_server = StoreServer(os.path.join(self.tmp_dir, "other.sock"))
+        try:
+            server_id = store_server._id
+            store_server._changes = [(SLOT, 1), (SLOT, 2), (SLOT, 3)]
+            self.assertEqual(store_server._changes_since([server_id, 0]),
+                             ([server_id, 3], [], True))
+            self.assertEqual(store_server._changes_since([server_id, 2]),
+                             ([server_id, 3], [(SLOT, 3)], False))
+            self.assertEqual(store_server._changes_since(["other", 2]),
+                             ([server_id, 3], [], True))
+            self.assertEqual(store_server._changes_since([server_id, 7]),
+                             ([server_id, 3], [], True))
+        finally:
+            server.MAX_CHANGES = max_changes
+            store_server.server_close()
+
+    def test_resync_after_restart(self):
+        Store.connect(self.socket_path)
+        asset_ = asset.Asset(slot.Slot(path=SLOT,
+                                       type=constants.CONTENT_TYPE.File))
+        events = []
+
+        def on_change(slot_, version):
+            events.append((slot_, version))
+        Store.subscribe(on_change)
+        self.server.terminate()
+        self.server.wait()
+        self._commit(3)
+        self.server = self._start_server()
+
+        try:
+            self.assertEqual(Store.refresh(), [(None, None)])
+            self.assertEqual(events, [(None, None)])
+            self.assertEqual(asset_.latest_version(), 3)
+            self.assertEqual(Store.refresh(), [])
+        finally:
+            Store.unsubscribe(on_change)
+
+    def test_timeout(self):
+        path = os.path.join(self.tmp_dir, "wedged.sock")
+        wedged = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        wedged.bind(path)
+        wedged.listen(1)
+        try:
+            client = StoreClient(path, pool_size=1, timeout=0.1)
+            self.assertRaises(StoreQueryException, client.get_entries, SLOT)
+            self.assertEqual(client._num_connections, 0)
+        finally:
+            wedged.close()
+
+    def test_invalid_source(self):
+        server_ = self._start_server(
+            source=os.path.join(self.tmp_dir, "missing.json"))
+        self.assertNotEqual(server_.wait(), 0)
+
+    def test_load_dependencies(self):
+        Store.connect(self.socket_path)
+        asset_ = asset.Asset(slot.Slot(path=SLOT,
+                                       type=constants.CONTENT_TYPE.File))
+        round_trips = self._count_round_trips()
+        dependencies = asset_.version(2).dependencies()
+        self.assertEqual(len(round_trips), 2)
+        self.assertEqual([(x.slot(), x.version()) for x in dependencies],
+                         [(SLOT, 1)])
+
+    def test_load_asset(self):
+        Store.connect(self.socket_path)
+        round_trips = self._count_round_trips()
+
+        asset_ = asset.Asset(slot.Slot(path=SLOT,
+                                       type=constants.CONTENT_TYPE.File))
+        self.assertEqual(len(round_trips), 1)
+        self.assertEqual(asset_.latest_version(), 2)
+        self.assertEqual(asset_.version(1).contents(),
+                         ["/project/library/characters/david/rig/david1.rig"])
+
+    def test_store_connect(self):
+        Store.connect(self.socket_path)
+        self.assertEqual(Store.get_type_data(SLOT), "File")
+        self.assertEqual(Store.get_dependency_data(SLOT, 2), [[SLOT, 1]])
+
+        self._commit(3)
+        self.assertEqual(Store.refresh(), [(SLOT, 3)])
+        self.assertEqual(Store.refresh(), [])
+        self.assertEqual(Store.get_version_data(SLOT, 3),
+                         {"contents": [], "dependencies": []})
+
+
+if __name__ == "__main__":
+    unittest.main()